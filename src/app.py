@@ -4,23 +4,36 @@ Expand customers pro-rata by their hours and generate a unique random order of c
 
 This script performs the following steps:
     1. Reads Data CoE Team & Customers.xlsx (expects columns: customer, hours, userstory)
-    2. Adds a 'weight' column = hours / HOURS_DIVISOR
-    3. Creates a deterministic list where proportions match exact weights
-    4. Expands the customer list according to weights
-    5. For each resource, creates a sheet in the output Excel file with a different random order of customers
-    6. Saves the expanded and randomized lists to an Excel file with a sheet per resource
+    2. Weights customers by hours / HOURS_DIVISOR and allocates occurrences pro-rata (largest remainder)
+    3. Expands the customer list according to the allocated occurrences
+    4. For each resource, creates a sheet in the output Excel file with a different random order of customers
+    5. Saves the expanded and randomized lists to an Excel file with a sheet per resource
 
 Typical usage example:
     $ python app.py
 """
 
 import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv  # NEW: import dotenv
-from typing import Optional
+from typing import List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+try:  # Numba is optional; the plain NumPy path is fine for small teams
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:  # calamine parses XLSX in native code; openpyxl is the fallback reader
+    import python_calamine  # noqa: F401
+    EXCEL_READ_ENGINE: Optional[str] = 'calamine'
+except ImportError:
+    EXCEL_READ_ENGINE = None
 
 # Load environment variables from .env file
 load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
@@ -43,6 +56,204 @@ else:
     RANDOM_SEED = int(np.random.randint(0, 100000))
 # --------------------------------
 
+def _allocate_occurrences(hours: np.ndarray, max_samples: int, divisor: int) -> np.ndarray:
+    """
+    Allocate max_samples across customers pro-rata by hours (largest remainder).
+
+    One fused pass over the hours array: weight, exact share, floor, then
+    top-up of the rows with the largest fractional parts via O(n)
+    argpartition selection.
+    """
+    weight = hours / divisor
+    exact = weight / weight.sum() * max_samples
+    occurrences = np.floor(exact).astype(np.int64)
+    remaining = max_samples - occurrences.sum()
+    if remaining > 0:
+        top = np.argpartition(-(exact - occurrences), remaining - 1)[:remaining]
+        occurrences[top] += 1
+    return occurrences
+
+if njit is not None:
+    @njit(cache=True)
+    def _allocate_occurrences(hours: np.ndarray, max_samples: int, divisor: int) -> np.ndarray:  # noqa: F811
+        # Same allocation compiled to native code; Numba has no argpartition,
+        # and a full argsort is cheap once JIT-compiled.
+        weight = hours / divisor
+        exact = weight / weight.sum() * max_samples
+        occurrences = np.floor(exact).astype(np.int64)
+        remaining = max_samples - occurrences.sum()
+        if remaining > 0:
+            top = np.argsort(-(exact - occurrences))[:remaining]
+            occurrences[top] += 1
+        return occurrences
+
+# ---------- Minimal XLSX emission ----------
+# to_excel routes every cell through xlsxwriter's Python per-cell write path,
+# which dominates the script's runtime. An XLSX file is just a zip of XML
+# parts, so the workbook skeleton is kept as string templates and worksheet
+# XML is emitted directly: shared-string references, no styling, and no
+# per-cell `r=` references (readers infer positions for contiguous cells).
+
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+
+_CONTENT_TYPES_XML = (
+    _XML_DECL +
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheet_overrides}'
+    '</Types>'
+)
+
+_SHEET_OVERRIDE_XML = (
+    '<Override PartName="/xl/worksheets/sheet{num}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+
+_ROOT_RELS_XML = (
+    _XML_DECL +
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_XML = (
+    _XML_DECL +
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+
+_SHEET_ENTRY_XML = '<sheet name="{name}" sheetId="{num}" r:id="rId{num}"/>'
+
+_WORKBOOK_RELS_XML = (
+    _XML_DECL +
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{rels}</Relationships>'
+)
+
+_SHEET_REL_XML = (
+    '<Relationship Id="rId{num}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{num}.xml"/>'
+)
+
+_SHEET_HEADER_XML = (
+    _XML_DECL +
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_FOOTER_XML = '</sheetData></worksheet>'
+
+_SST_OVERRIDE_XML = (
+    '<Override PartName="/xl/sharedStrings.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+)
+
+_SST_REL_XML = (
+    '<Relationship Id="rId{num}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+    'Target="sharedStrings.xml"/>'
+)
+
+_SHARED_STRINGS_XML = (
+    _XML_DECL +
+    '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'count="{count}" uniqueCount="{count}">{items}</sst>'
+)
+
+
+def _sst_cell(index: int) -> str:
+    """Return cell XML referencing a shared-string table entry."""
+    return f'<c t="s"><v>{index}</v></c>'
+
+
+_BLANK_CELL_XML = '<c/>'
+
+
+_SHEET_COLUMNS = ('customer', 'ceremony', 'claimed', 'what')
+
+
+def _build_customer_sheet_xml(
+    header_row: str,
+    row_codes: np.ndarray,
+    row_cells: List[str],
+) -> bytes:
+    """Serialize a shuffled sheet from row codes and prebuilt per-row XML."""
+    parts = [_SHEET_HEADER_XML, header_row]
+    parts.extend(row_cells[code] for code in row_codes)
+    parts.append(_SHEET_FOOTER_XML)
+    return ''.join(parts).encode('utf-8')
+
+
+_EMPTY_SHEET_XML = (_SHEET_HEADER_XML + _SHEET_FOOTER_XML).encode('utf-8')
+
+_SHEET_NAME_INVALID_CHARS = set('[]:*?/\\')
+
+
+def _validate_sheet_names(names: List[str]) -> None:
+    """
+    Enforce Excel's worksheet naming rules, as xlsxwriter used to.
+
+    Resource names are free-text input; a bad name baked into the workbook
+    XML would make Excel refuse to open the file, so fail loudly up front.
+    """
+    seen = set()
+    for name in names:
+        if not name:
+            raise ValueError("Worksheet name cannot be empty")
+        if len(name) > 31:
+            raise ValueError(f"Worksheet name {name!r} is longer than 31 characters")
+        invalid = _SHEET_NAME_INVALID_CHARS.intersection(name)
+        if invalid:
+            raise ValueError(
+                f"Worksheet name {name!r} contains invalid character(s): {''.join(sorted(invalid))}"
+            )
+        if name.startswith("'") or name.endswith("'"):
+            raise ValueError(f"Worksheet name {name!r} cannot start or end with an apostrophe")
+        lowered = name.lower()
+        if lowered in seen:
+            raise ValueError(f"Duplicate worksheet name {name!r} (Excel compares case-insensitively)")
+        seen.add(lowered)
+
+
+def _write_xlsx(
+    output_path: Path,
+    sheets: List[Tuple[str, bytes]],
+    shared_strings: Optional[List[str]] = None,
+) -> None:
+    """Pack named worksheet XML payloads into a valid XLSX zip."""
+    if not sheets:
+        # An XLSX file needs at least one sheet to be readable.
+        sheets = [('Sheet1', _EMPTY_SHEET_XML)]
+    _validate_sheet_names([name for name, _ in sheets])
+    nums = range(1, len(sheets) + 1)
+    overrides = ''.join(_SHEET_OVERRIDE_XML.format(num=i) for i in nums)
+    entries = ''.join(
+        _SHEET_ENTRY_XML.format(name=escape(name, {'"': '&quot;'}), num=i)
+        for i, (name, _) in zip(nums, sheets)
+    )
+    rels = ''.join(_SHEET_REL_XML.format(num=i) for i in nums)
+    if shared_strings is not None:
+        overrides += _SST_OVERRIDE_XML
+        rels += _SST_REL_XML.format(num=len(sheets) + 1)
+    # Level-1 deflate is a fraction of the CPU of the default level for a
+    # modest size increase — fine for throwaway daily files.
+    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES_XML.format(sheet_overrides=overrides))
+        zf.writestr('_rels/.rels', _ROOT_RELS_XML)
+        zf.writestr('xl/workbook.xml', _WORKBOOK_XML.format(sheets=entries))
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS_XML.format(rels=rels))
+        if shared_strings is not None:
+            items = ''.join(f'<si><t>{escape(str(s))}</t></si>' for s in shared_strings)
+            zf.writestr(
+                'xl/sharedStrings.xml',
+                _SHARED_STRINGS_XML.format(count=len(shared_strings), items=items),
+            )
+        for i, (_, sheet_xml) in zip(nums, sheets):
+            zf.writestr(f'xl/worksheets/sheet{i}.xml', sheet_xml)
+
+
 def generate_resource_customer_sheets(
     expanded_df: pd.DataFrame,
     resources_df: pd.DataFrame,
@@ -62,19 +273,55 @@ def generate_resource_customer_sheets(
         bool: True if sheets are generated (even if none are written), False otherwise.
     """
     resource_names = resources_df['resource'].unique()
-    with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
-        if len(resource_names) == 0:
-            print("[WARN] No resources found. No sheets will be written.")
-        else:
-            for i, resource in enumerate(resource_names):
-                # Use a different seed for each resource to ensure different shuffles
-                resource_seed = (random_seed + i) if random_seed is not None else None
-                shuffled_customers = expanded_df.sample(frac=1, random_state=resource_seed).reset_index(drop=True)
-                # Add empty 'claimed' and 'what' columns
-                shuffled_customers = shuffled_customers[['customer', 'ceremony']].copy()
-                shuffled_customers['claimed'] = ''
-                shuffled_customers['what'] = ''
-                shuffled_customers.to_excel(writer, sheet_name=str(resource), index=False)
+    # Shuffle categorical codes rather than object arrays: the rows repeat a
+    # small set of strings, so each permutation gather moves narrow integer
+    # codes and the cell XML for every unique string is escaped exactly once.
+    cust_cat = expanded_df['customer'].astype('category')
+    cer_cat = expanded_df['ceremony'].astype('category')
+    # Categorical codes are -1 for missing values; shift everything up by one
+    # so NaN maps to slot 0 (a blank cell) instead of wrapping around to the
+    # last category's cell when used as a list index.
+    cust_codes = cust_cat.cat.codes.to_numpy().astype(np.int32) + 1
+    cer_codes = cer_cat.cat.codes.to_numpy().astype(np.int32) + 1
+    # Every sheet repeats the same strings, so register each unique value in
+    # one shared-string table and emit cells as integer references into it.
+    shared_strings = list(dict.fromkeys(
+        (*_SHEET_COLUMNS, *cust_cat.cat.categories, *cer_cat.cat.categories)
+    ))
+    sst_index = {value: i for i, value in enumerate(shared_strings)}
+    header_row = '<row>' + ''.join(_sst_cell(sst_index[col]) for col in _SHEET_COLUMNS) + '</row>'
+    cust_cells = [_BLANK_CELL_XML] + [_sst_cell(sst_index[value]) for value in cust_cat.cat.categories]
+    cer_cells = [_BLANK_CELL_XML] + [_sst_cell(sst_index[value]) for value in cer_cat.cat.categories]
+    # customer and ceremony expand from the same source row, so collapse each
+    # row to one integer pair code and prebuild its complete <row> XML; a
+    # sheet is then a single int gather plus ready-made row lookups.
+    # claimed/what are never written; readers treat missing cells as empty.
+    n_cer = len(cer_cells)
+    row_codes, unique_pairs = pd.factorize(cust_codes * n_cer + cer_codes)
+    row_cells = [
+        f'<row>{cust_cells[pair // n_cer]}{cer_cells[pair % n_cer]}</row>'
+        for pair in unique_pairs
+    ]
+    n = len(row_codes)
+    # One PCG64 generator seeded once; successive permutation draws give each
+    # resource a different shuffle without re-seeding per resource.
+    rng = np.random.default_rng(random_seed)
+
+    def _sheet_payload(item: Tuple[str, np.ndarray]) -> Tuple[str, bytes]:
+        resource, perm = item
+        return resource, _build_customer_sheet_xml(header_row, row_codes[perm], row_cells)
+
+    sheets: List[Tuple[str, bytes]] = []
+    if len(resource_names) == 0:
+        print("[WARN] No resources found. No sheets will be written.")
+    else:
+        # Draw permutations here so the RNG stream stays deterministic, then
+        # build the XML payloads in parallel; only the zip writes below run
+        # on this thread.
+        jobs = [(str(resource), rng.permutation(n)) for resource in resource_names]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            sheets = list(pool.map(_sheet_payload, jobs))
+    _write_xlsx(output_path, sheets, shared_strings=shared_strings)
     return True
 
 def main() -> None:
@@ -85,9 +332,11 @@ def main() -> None:
     and generates an Excel file with a sheet for each resource.
     """
     # 1️⃣ Load the original file (from Excel, 'customers' and 'resources' sheets)
+    # A single ExcelFile handle parses the workbook once for both sheets.
     try:
-        customers_df = pd.read_excel(SOURCE_FILE, sheet_name="customers")
-        resources_df = pd.read_excel(SOURCE_FILE, sheet_name="resources")
+        with pd.ExcelFile(SOURCE_FILE, engine=EXCEL_READ_ENGINE) as xl:
+            customers_df = pd.read_excel(xl, sheet_name="customers")
+            resources_df = pd.read_excel(xl, sheet_name="resources")
     except FileNotFoundError:
         print(f"[ERROR] Source file not found: {SOURCE_FILE}")
         return
@@ -101,31 +350,33 @@ def main() -> None:
             print(f"[ERROR] Missing required column: {col}")
             return
 
-    # 2️⃣ Weight column (hours ÷ HOURS_DIVISOR)
-    customers_df["weight"] = customers_df["hours"] / HOURS_DIVISOR
-    weight_sum = customers_df["weight"].sum()
-    customers_df["proportion"] = customers_df["weight"] / weight_sum
-    customers_df["exact_occurrences"] = customers_df["proportion"] * MAX_SAMPLES
-    customers_df["occurrences"] = np.floor(customers_df["exact_occurrences"]).astype(int)
+    # 2️⃣ Add ceremony column (was: userstory)
+    customers_df["ceremony"] = customers_df["userstory"].astype(str) + ": Data CoE ceremony"
 
-    # 3️⃣ Add ceremony column (was: userstory)
-    customers_df["ceremony"] = customers_df["userstory"].apply(lambda u: f"{u}: Data CoE ceremony")
+    # Materialize the column arrays once; each .to_numpy() call on an object
+    # series allocates afresh, so the cached views serve both the allocation
+    # and the expansion below.
+    hrs_arr = customers_df["hours"].to_numpy(dtype=np.float64)
+    cust_arr = customers_df["customer"].to_numpy(copy=False)
+    cer_arr = customers_df["ceremony"].to_numpy(copy=False)
 
-    # 4️⃣ Distribute remaining samples based on fractional parts
-    remaining_samples = MAX_SAMPLES - customers_df["occurrences"].sum()
-    if remaining_samples > 0:
-        fractional_parts = customers_df["exact_occurrences"] - customers_df["occurrences"]
-        indices = fractional_parts.sort_values(ascending=False).index[:int(remaining_samples)]
-        customers_df.loc[indices, "occurrences"] += 1
+    # 3️⃣ Allocate occurrences pro-rata by hours ÷ HOURS_DIVISOR; the helper
+    # covers weight, proportion, floor, and largest-remainder top-up in one
+    # NumPy pass, so no intermediate pandas columns are materialized.
+    occ_arr = _allocate_occurrences(hrs_arr, MAX_SAMPLES, HOURS_DIVISOR)
+    customers_df["occurrences"] = occ_arr
 
-    # 5️⃣ Create expanded dataframe using repetition
+    # 4️⃣ Create expanded dataframe using repetition
+    # Expand row indices once, then gather each column through the same index
+    # array rather than walking 'occurrences' three times with np.repeat.
+    idx = np.repeat(np.arange(len(customers_df)), occ_arr)
     expanded_df = pd.DataFrame({
-        'customer': np.repeat(customers_df['customer'].to_numpy(), customers_df['occurrences'].to_numpy()),
-        'ceremony': np.repeat(customers_df['ceremony'].to_numpy(), customers_df['occurrences'].to_numpy()),
-        'hours': np.repeat(customers_df['hours'].to_numpy(), customers_df['occurrences'].to_numpy())
+        'customer': cust_arr[idx],
+        'ceremony': cer_arr[idx],
+        'hours': hrs_arr[idx]
     })
 
-    # 6️⃣ Generate resource sheets
+    # 5️⃣ Generate resource sheets
     generate_resource_customer_sheets(
         expanded_df,
         resources_df,
@@ -31,20 +31,20 @@ def test_weight_column(customers_df):
     df["weight"] = df["hours"] / 15
     assert np.allclose(df["weight"], [1, 2, 3])
 
-def test_proportion_and_occurrences(customers_df):
-    df = customers_df.copy()
-    df["weight"] = df["hours"] / 15
-    weight_sum = df["weight"].sum()
-    df["proportion"] = df["weight"] / weight_sum
-    df["exact_occurrences"] = df["proportion"] * MAX_SAMPLES
-    df["occurrences"] = np.floor(df["exact_occurrences"]).astype(int)
-    assert df["occurrences"].sum() <= MAX_SAMPLES
+def test_allocate_occurrences_sums_to_max_samples(customers_df):
+    from app import _allocate_occurrences
+    occurrences = _allocate_occurrences(
+        customers_df["hours"].to_numpy(dtype=np.float64), MAX_SAMPLES, 15
+    )
+    assert occurrences.sum() == MAX_SAMPLES
+    assert (occurrences >= 0).all()
 
-def test_remaining_samples_distribution(customers_df):
+def test_allocate_occurrences_matches_largest_remainder(customers_df):
+    from app import _allocate_occurrences
+    # Reference implementation: the original pandas largest-remainder steps.
     df = customers_df.copy()
     df["weight"] = df["hours"] / 15
-    weight_sum = df["weight"].sum()
-    df["proportion"] = df["weight"] / weight_sum
+    df["proportion"] = df["weight"] / df["weight"].sum()
     df["exact_occurrences"] = df["proportion"] * MAX_SAMPLES
     df["occurrences"] = np.floor(df["exact_occurrences"]).astype(int)
     remaining_samples = MAX_SAMPLES - df["occurrences"].sum()
@@ -52,55 +52,28 @@ def test_remaining_samples_distribution(customers_df):
         fractional_parts = df["exact_occurrences"] - df["occurrences"]
         indices = fractional_parts.sort_values(ascending=False).index[:int(remaining_samples)]
         df.loc[indices, "occurrences"] += 1
-    assert df["occurrences"].sum() == MAX_SAMPLES
+    occurrences = _allocate_occurrences(
+        df["hours"].to_numpy(dtype=np.float64), MAX_SAMPLES, 15
+    )
+    assert np.array_equal(occurrences, df["occurrences"].to_numpy())
 
 def test_expanded_df(customers_df):
+    from app import _allocate_occurrences
     df = customers_df.copy()
-    df["weight"] = df["hours"] / 15
-    weight_sum = df["weight"].sum()
-    df["proportion"] = df["weight"] / weight_sum
-    df["exact_occurrences"] = df["proportion"] * MAX_SAMPLES
-    df["occurrences"] = np.floor(df["exact_occurrences"]).astype(int)
-    remaining_samples = MAX_SAMPLES - df["occurrences"].sum()
-    if remaining_samples > 0:
-        fractional_parts = df["exact_occurrences"] - df["occurrences"]
-        indices = fractional_parts.sort_values(ascending=False).index[:int(remaining_samples)]
-        df.loc[indices, "occurrences"] += 1
-    df["ceremony"] = df["customer"].apply(lambda c: f"{c}: Data CoE ceremony")
+    occurrences = _allocate_occurrences(
+        df["hours"].to_numpy(dtype=np.float64), MAX_SAMPLES, 15
+    )
+    df["ceremony"] = df["customer"].astype(str) + ": Data CoE ceremony"
+    idx = np.repeat(np.arange(len(df)), occurrences)
     expanded_df = pd.DataFrame({
-        'customer': np.repeat(df['customer'].values, df['occurrences'].values),
-        'ceremony': np.repeat(df['ceremony'].values, df['occurrences'].values),
-        'hours': np.repeat(df['hours'].values, df['occurrences'].values)
+        'customer': df['customer'].to_numpy()[idx],
+        'ceremony': df['ceremony'].to_numpy()[idx],
+        'hours': df['hours'].to_numpy()[idx]
     })
     assert len(expanded_df) == MAX_SAMPLES
     assert set(expanded_df['customer']).issubset(set(df['customer']))
     assert 'ceremony' in expanded_df.columns
 
-def generate_resource_customer_sheets(expanded_df, resources_df, output_path, random_seed=None):
-    """
-    For each resource, create a sheet in an Excel file with a unique randomized customer list.
-    Args:
-        expanded_df (pd.DataFrame): DataFrame containing expanded customer rows with columns 'customer' and 'ceremony'.
-        resources_df (pd.DataFrame): DataFrame containing resources with a 'resource' column.
-        output_path (Path): Path to the output Excel file.
-        random_seed (Optional[int], optional): Random seed for reproducibility. Defaults to None.
-    Returns:
-        bool: True if sheets are generated (even if none are written), False otherwise.
-    """
-    resource_names = resources_df['resource'].unique()
-    with pd.ExcelWriter(output_path) as writer:
-        if len(resource_names) == 0:
-            pass  # No sheets written
-        else:
-            for i, resource in enumerate(resource_names):
-                resource_seed = (random_seed + i) if random_seed is not None else None
-                shuffled_customers = expanded_df.sample(frac=1, random_state=resource_seed).reset_index(drop=True)
-                df_to_write = shuffled_customers[['customer', 'ceremony']].copy()
-                df_to_write['claimed'] = ''
-                df_to_write['what'] = ''
-                df_to_write.to_excel(writer, sheet_name=resource, index=False)
-    return True
-
 def test_generate_resource_customer_sheets(tmp_path):
     import pandas as pd
     from app import generate_resource_customer_sheets
@@ -139,6 +112,39 @@ def test_generate_resource_customer_sheets_no_resources(tmp_path):
     # Accept either no sheets or a default sheet (e.g., 'Sheet1') if no resources
     assert xls.sheet_names == [] or xls.sheet_names == ['Sheet1']
 
+# Failure case: resource names that break Excel's worksheet naming rules
+
+def test_generate_resource_customer_sheets_invalid_sheet_name(tmp_path):
+    import pandas as pd
+    from app import generate_resource_customer_sheets
+    expanded_df = pd.DataFrame({'customer': ['A'], 'ceremony': ['A: Data CoE ceremony'], 'hours': [10]})
+    output_path = tmp_path / "invalid_name.xlsx"
+    for bad_name in ['Bad/Name', 'x' * 32]:
+        resources_df = pd.DataFrame({'resource': [bad_name]})
+        with pytest.raises(ValueError):
+            generate_resource_customer_sheets(expanded_df, resources_df, output_path)
+    with pytest.raises(ValueError):
+        generate_resource_customer_sheets(
+            expanded_df, pd.DataFrame({'resource': ['R1', 'r1']}), output_path
+        )
+
+# Edge case: missing customer value must stay blank, not borrow another row's string
+
+def test_generate_resource_customer_sheets_nan_customer(tmp_path):
+    import pandas as pd
+    from app import generate_resource_customer_sheets
+    expanded_df = pd.DataFrame({
+        'customer': ['A', np.nan, 'B'],
+        'ceremony': [f'{c}: Data CoE ceremony' for c in ['A', 'X', 'B']],
+        'hours': [10, 20, 30]
+    })
+    resources_df = pd.DataFrame({'resource': ['R1']})
+    output_path = tmp_path / "nan_resources_customers.xlsx"
+    assert generate_resource_customer_sheets(expanded_df, resources_df, output_path, random_seed=42)
+    df = pd.read_excel(output_path, sheet_name='R1')
+    assert df['customer'].isna().sum() == 1
+    assert set(df['customer'].dropna()) == {'A', 'B'}
+
 # Failure case: expanded_df empty
 
 def test_generate_resource_customer_sheets_empty_expanded(tmp_path):